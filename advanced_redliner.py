@@ -1,19 +1,424 @@
+import atexit
+import bisect
+import contextlib
+import functools
+import importlib.util
+import itertools
+import re
+import shutil
 import subprocess
+import sys
 import tempfile
 import os
+import threading
+import time
 import platform
 import logging
 import zipfile
-import tarfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Union, Tuple, Optional, List, Dict
-from docx import Document
 from io import BytesIO
+from lxml import etree
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 __version__ = "0.0.4"  # Make sure this matches the version of binaries you have
 
 logger = logging.getLogger(__name__)
 
+# The host platform never changes at runtime, so probe it once
+_OS_NAME = platform.system().lower()
+_ARCH = platform.machine().lower()
+
+
+def _binaries_info() -> Tuple[str, str]:
+    # Platform tag and binary archive name for this host
+    if _ARCH in ("x86_64", "amd64"):
+        arch = "x64"
+    elif _ARCH in ("arm64", "aarch64"):
+        arch = "arm64"
+    else:
+        raise EnvironmentError(f"Unsupported architecture: {_ARCH}")
+
+    if _OS_NAME == "linux":
+        return f"linux-{arch}", f"linux-{arch}-{__version__}.tar.gz"
+    elif _OS_NAME == "windows":
+        return f"win-{arch}", f"win-{arch}-{__version__}.zip"
+    elif _OS_NAME == "darwin":
+        return f"osx-{arch}", f"osx-{arch}-{__version__}.tar.gz"
+    else:
+        raise EnvironmentError("Unsupported OS")
+
+
+_BINARY_NAME = "redlines.exe" if _OS_NAME == "windows" else "redlines"
+# Shipped archives live in binaries/, extracted binaries in bin/
+_BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+_BINARIES_PATH = os.path.join(_BASE_PATH, "binaries")
+_BIN_PATH = os.path.join(_BASE_PATH, "bin")
+try:
+    _PLATFORM_TAG, _ARCHIVE_NAME = _binaries_info()
+except EnvironmentError:
+    # Left for the first binary lookup to report
+    _PLATFORM_TAG = _ARCHIVE_NAME = None
+
+# Fallback temp files go in an explicitly configured TMPDIR, else on tmpfs when
+# there is one so they stay in RAM, else in the platform default
+_TEMP_DIR = os.environ.get("TMPDIR") or (
+    "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+)
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+_DOCUMENT_PART = "word/document.xml"
+_XML_PARSER = etree.XMLParser(resolve_entities=False)
+
+# Run children that contribute text, mirroring python-docx's Paragraph.text;
+# w:t and w:br are handled in _child_text
+_RUN_TEXT = {
+    f"{_W}tab": "\t",
+    f"{_W}cr": "\n",
+    f"{_W}noBreakHyphen": "-",
+    f"{_W}ptab": "\t",
+}
+
+
+def _paragraph_runs(paragraph):
+    return paragraph.xpath(
+        "./w:r | ./w:hyperlink/w:r", namespaces={"w": _W.strip("{}")}
+    )
+
+
+def _child_text(child) -> str:
+    if child.tag == f"{_W}t":
+        return child.text or ""
+    if child.tag == f"{_W}br":
+        # Only line breaks are text; page and column breaks are zero-width
+        if child.get(f"{_W}type", "textWrapping") == "textWrapping":
+            return "\n"
+        return ""
+    return _RUN_TEXT.get(child.tag, "")
+
+
+def _run_text(run) -> str:
+    return "".join(_child_text(child) for child in run)
+
+
+def _paragraph_text(paragraph) -> str:
+    return "".join(_run_text(run) for run in _paragraph_runs(paragraph))
+
+
+def _text_segments(paragraph) -> List[Tuple[etree._Element, int, int]]:
+    # Every w:t of the paragraph with the [start, end) offsets its text covers
+    # in _paragraph_text(paragraph)
+    segments = []
+    position = 0
+    for run in _paragraph_runs(paragraph):
+        for child in run:
+            if child.tag == f"{_W}t":
+                length = len(child.text or "")
+                segments.append((child, position, position + length))
+                position += length
+            else:
+                position += len(_child_text(child))
+    return segments
+
+
+def _replace_in_runs(paragraph, edits: List[Tuple[int, int, str]]) -> bool:
+    # Apply (start, end, new_text) edits, given in paragraph text order, inside
+    # the w:t elements that hold them. An edit spanning several text nodes puts
+    # the new text in the first one and trims the others, so the surrounding
+    # runs keep their formatting. Returns False without touching anything if an
+    # edit covers a tab or line break, or inserts one.
+    segments = _text_segments(paragraph)
+    located = []
+    for start, end, new_text in edits:
+        if "\n" in new_text or "\t" in new_text:
+            return False
+        covering = [
+            segment for segment in segments if segment[1] < end and start < segment[2]
+        ]
+        if (
+            not covering
+            or covering[0][1] > start
+            or covering[-1][2] < end
+            or any(a[2] != b[1] for a, b in zip(covering, covering[1:]))
+        ):
+            return False
+        located.append((covering, start, end, new_text))
+
+    # Right to left, so earlier offsets in the same element stay valid
+    for covering, start, end, new_text in reversed(located):
+        first, first_start, _ = covering[0]
+        last, last_start, _ = covering[-1]
+        head = (first.text or "")[: start - first_start]
+        tail = (last.text or "")[end - last_start :]
+        if len(covering) == 1:
+            first.text = head + new_text + tail
+        else:
+            first.text = head + new_text
+            for element, _, _ in covering[1:-1]:
+                element.text = ""
+            last.text = tail
+        for element, _, _ in covering:
+            element.set(_XML_SPACE, "preserve")
+    return True
+
+
+def _set_paragraph_text(paragraph, text: str):
+    # Same result as python-docx's paragraph.clear() + add_run(text): keep the
+    # paragraph properties, replace everything else with one plain run
+    for child in list(paragraph):
+        if child.tag != f"{_W}pPr":
+            paragraph.remove(child)
+    run = etree.SubElement(paragraph, f"{_W}r")
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            etree.SubElement(run, f"{_W}br")
+        for j, chunk in enumerate(line.split("\t")):
+            if j:
+                etree.SubElement(run, f"{_W}tab")
+            if chunk:
+                t = etree.SubElement(run, f"{_W}t")
+                t.text = chunk
+                t.set(_XML_SPACE, "preserve")
+
+
+def _load_document_xml(doc_content: bytes):
+    with zipfile.ZipFile(BytesIO(doc_content)) as docx_zip:
+        return etree.fromstring(docx_zip.read(_DOCUMENT_PART), parser=_XML_PARSER)
+
+
+def _replace_docx_part(doc_content: bytes, part_name: str, data: bytes) -> bytes:
+    # The modified docx only lives long enough to be diffed by the redline
+    # binary, so store entries uncompressed rather than paying for deflate
+    output = BytesIO()
+    with zipfile.ZipFile(BytesIO(doc_content)) as source, zipfile.ZipFile(
+        output, "w", zipfile.ZIP_STORED
+    ) as target:
+        for info in source.infolist():
+            if info.filename == part_name:
+                target.writestr(part_name, data)
+            else:
+                with source.open(info) as src, target.open(info.filename, "w") as dst:
+                    shutil.copyfileobj(src, dst)
+    return output.getvalue()
+
+
+# Archive members that aren't needed to run the binary (debug symbols)
+_NON_RUNTIME_SUFFIXES = (".pdb",)
+
+
+@contextlib.contextmanager
+def _open_tar_stream(archive_path: str):
+    # Only needed on the rare cold start that extracts the binary
+    import tarfile
+
+    with open(archive_path, "rb") as archive:
+        if archive_path.endswith(".tar.zst"):
+            import zstandard
+
+            fileobj = zstandard.ZstdDecompressor().stream_reader(archive)
+            mode = "r|"
+        else:
+            fileobj = archive
+            mode = "r|gz"
+        with tarfile.open(fileobj=fileobj, mode=mode) as tar_ref:
+            yield tar_ref
+
+
+# Fallback call directories kept for reuse per engine
+_MAX_FREE_CALL_DIRS = 8
+
+# Idle pre-started binaries kept across all engines and author tags, and how
+# long one may wait for a request before it is stopped
+_MAX_SPARE_PROCESSES = 4
+_SPARE_IDLE_SECONDS = 300
+
+# Tops up the spare pool once a request has its process, off the request path;
+# a single thread, so refills never race each other past the limits
+_spare_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="redline-spare")
+
+_cleanup_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="redline-cleanup"
+)
+
+
+def _remove_temp_dir(dir_path: str):
+    # Runs off the request path and only concerns scratch space, so failures
+    # are logged at debug level, and files already gone are not failures
+    def log_error(function, path, error):
+        if not isinstance(error, FileNotFoundError):
+            logger.debug(f"Error deleting temp file {path}: {error}")
+
+    # onerror is deprecated from Python 3.12 in favour of onexc, which is
+    # passed the exception itself
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(dir_path, onexc=log_error)
+    else:
+        shutil.rmtree(
+            dir_path,
+            onerror=lambda function, path, exc_info: log_error(
+                function, path, exc_info[1]
+            ),
+        )
+
+
+def _decode_output(data: Optional[bytes]) -> Optional[str]:
+    # The binary's stdout/stderr are captured as bytes and only decoded when
+    # there is something to return
+    return data.decode("utf-8", errors="replace") if data else None
+
+
+# Documents are usually hundreds of KB, so widen pipes from the 64 KiB default
+# to cut the number of blocking write/read round trips with the binary
+_PIPE_SIZE = 1024 * 1024
+
+
+def _make_pipe() -> Tuple[int, int]:
+    read_fd, write_fd = os.pipe()
+    if hasattr(fcntl, "F_SETPIPE_SZ"):  # Linux only
+        try:
+            fcntl.fcntl(write_fd, fcntl.F_SETPIPE_SZ, _PIPE_SIZE)
+        except OSError:
+            # Over the per-user pipe size limit; the default still works
+            pass
+    return read_fd, write_fd
+
+
+def _feed_pipe(fd: int, data: bytes):
+    view = memoryview(data)
+    try:
+        while view:
+            view = view[os.write(fd, view) :]
+    except BrokenPipeError:
+        # The binary exited without reading everything; its stderr says why
+        pass
+    finally:
+        os.close(fd)
+
+
+def _drain_pipe(fd: int, chunks: List[bytes]):
+    # Unbuffered: readall() reads straight into a growing result, with no
+    # intermediate buffer copy
+    with open(fd, "rb", buffering=0) as pipe:
+        chunks.append(pipe.read())
+
+
+class _PipedRedlineProcess:
+    """
+    One run of the redline binary with kernel pipes behind /dev/fd/N paths for
+    its inputs (unless given real paths) and its output (unless given a target
+    path). It can be started ahead of time: the binary boots its runtime, then
+    blocks reading the input pipes until run() feeds them.
+    """
+
+    def __init__(
+        self,
+        binary_path: str,
+        author_tag: str,
+        sources: Tuple[Optional[Path], Optional[Path]] = (None, None),
+        target: Optional[str] = None,
+        capture_stdout: bool = True,
+    ):
+        self.capture_stdout = capture_stdout
+        self._feed_fds = []
+        self._output_fd = None
+        child_fds = []
+        try:
+            input_paths = []
+            for source in sources:
+                if source is None:
+                    read_fd, write_fd = _make_pipe()
+                    self._feed_fds.append(write_fd)
+                    child_fds.append(read_fd)
+                    input_paths.append(f"/dev/fd/{read_fd}")
+                else:
+                    input_paths.append(str(source))
+
+            if target is None:
+                self._output_fd, output_write_fd = _make_pipe()
+                child_fds.append(output_write_fd)
+                target = f"/dev/fd/{output_write_fd}"
+
+            self.command = [binary_path, author_tag, *input_paths, target]
+            self.process = subprocess.Popen(
+                self.command,
+                stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                pass_fds=child_fds,
+            )
+        except BaseException:
+            self._close_parent_fds()
+            raise
+        finally:
+            # The child holds its own copies; closing ours lets EOF propagate
+            for fd in child_fds:
+                os.close(fd)
+
+    def run(
+        self, inputs: List[bytes]
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        # The output is None when the binary wrote to a target path
+        output_chunks = []
+        threads = [
+            threading.Thread(target=_feed_pipe, args=(fd, data), daemon=True)
+            for fd, data in zip(self._feed_fds, inputs)
+        ]
+        drains_output = self._output_fd is not None
+        if drains_output:
+            threads.append(
+                threading.Thread(
+                    target=_drain_pipe,
+                    args=(self._output_fd, output_chunks),
+                    daemon=True,
+                )
+            )
+        # The threads now own (and will close) the pipe ends
+        self._feed_fds = []
+        self._output_fd = None
+        for thread in threads:
+            thread.start()
+
+        try:
+            stdout, stderr = self.process.communicate(timeout=60)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.communicate()
+            logger.error("Redline process timed out after 60 seconds")
+            raise RuntimeError(
+                "Redline generation timed out. The document may be too large or complex."
+            )
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self.process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                self.process.returncode, self.command, stdout, stderr
+            )
+
+        output = b"".join(output_chunks) if drains_output else None
+        return output, _decode_output(stdout), _decode_output(stderr)
+
+    def discard(self):
+        self._close_parent_fds()
+        self.process.kill()
+        self.process.communicate()
+
+    def _close_parent_fds(self):
+        for fd in self._feed_fds:
+            os.close(fd)
+        if self._output_fd is not None:
+            os.close(self._output_fd)
+        self._feed_fds = []
+        self._output_fd = None
+
 
 class XmlPowerToolsEngine(object):
     """
@@ -21,16 +426,58 @@ class XmlPowerToolsEngine(object):
     This is a more sophisticated approach than pure Python-based solutions.
     """
 
-    def __init__(self, target_path: Optional[str] = None):
+    # Cleared the first time the binary fails on /dev/fd paths but succeeds
+    # on real files, so later calls skip straight to temp files
+    _pipes_supported = os.path.isdir("/dev/fd")
+
+    # Pre-started binaries waiting on their input pipes, with the time each one
+    # went idle, so that many concurrent redlines skip the runtime startup.
+    # Shared by all engines and keyed by binary path, author tag and stdout
+    # capture setting.
+    _spares: Dict[Tuple[str, str, bool], List[Tuple[float, "_PipedRedlineProcess"]]] = (
+        defaultdict(list)
+    )
+    _spares_lock = threading.Lock()
+    # Stops spares idle for longer than _SPARE_IDLE_SECONDS, while there are any
+    _spare_reaper: Optional[threading.Timer] = None
+
+    def __init__(self, target_path: Optional[str] = None, spare_processes: int = 2):
         self.target_path = target_path
-        self.extracted_binaries_path = self.__get_binary_path()
+        self.extracted_binaries_path = self.__get_binary_path(target_path)
+        self.__prefetch_binary(self.extracted_binaries_path)
+        # Spares kept per author tag and stdout capture setting, within the
+        # overall _MAX_SPARE_PROCESSES
+        self.spare_processes = spare_processes
+        # Scratch directory for the temp-file fallback, made on first use
+        self._scratch_dir: Optional[str] = None
+        self._scratch_lock = threading.Lock()
+        # Emptied call directories kept for reuse, so repeated fallback calls
+        # overwrite existing files instead of creating and deleting inodes
+        self._free_call_dirs: List[str] = []
 
-    def __get_binary_path(self):
+    @staticmethod
+    def __prefetch_binary(binary_path: str):
+        # Ask the kernel to read the executable into the page cache now, so the
+        # first redline doesn't fault its pages in from disk
+        if not hasattr(os, "posix_fadvise"):  # Not on Windows or macOS
+            return
+        try:
+            fd = os.open(binary_path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.debug(f"Could not prefetch {binary_path}: {e}")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def __get_binary_path(target_path: Optional[str] = None):
+        # Cached per target path, so the stats and any extraction below only
+        # run for the first engine of the process.
         # First check if the binary is directly available in bin directory
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        bin_path = os.path.join(base_path, "bin")
-        binary_name = self.__get_binary_name()
-        direct_binary_path = os.path.join(bin_path, binary_name)
+        binary_name = _BINARY_NAME
+        direct_binary_path = os.path.join(_BIN_PATH, binary_name)
 
         if os.path.exists(direct_binary_path) and os.access(
             direct_binary_path, os.X_OK
@@ -38,92 +485,419 @@ class XmlPowerToolsEngine(object):
             logger.info(f"Using pre-extracted binary at {direct_binary_path}")
             return direct_binary_path
 
-        # If not found in bin directory, try Lambda Layer
+        # If not found in bin directory, try Lambda Layer (the layer ships the
+        # binary already chmod 0755, so it is used as-is)
         layer_path = "/opt/binaries"
         if os.path.exists(layer_path):
             full_binary_path = os.path.join(layer_path, binary_name)
             if os.path.exists(full_binary_path):
                 return full_binary_path
 
+        # Then the per-platform directory populated at build time (or by an
+        # earlier extraction), which survives restarts of the service
+        if not target_path:
+            platform_binary_path = os.path.join(
+                _BIN_PATH, XmlPowerToolsEngine.__get_binaries_info()[0], binary_name
+            )
+            if os.access(
+                platform_binary_path, os.X_OK
+            ) and XmlPowerToolsEngine.__is_extracted(
+                os.path.dirname(platform_binary_path)
+            ):
+                logger.info(f"Using pre-extracted binary at {platform_binary_path}")
+                return platform_binary_path
+
         # Fall back to extracting from archive
-        return self.__unzip_binary()
+        return XmlPowerToolsEngine.__unzip_binary(target_path)
 
-    def __unzip_binary(self):
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        binaries_path = os.path.join(base_path, "binaries")
+    @staticmethod
+    def __unzip_binary(target_path: Optional[str] = None):
         target_path = (
-            self.target_path if self.target_path else os.path.join(base_path, "bin")
+            target_path
+            if target_path
+            else os.path.join(_BIN_PATH, XmlPowerToolsEngine.__get_binaries_info()[0])
         )
 
-        if not os.path.exists(target_path):
-            os.makedirs(target_path)
+        os.makedirs(target_path, exist_ok=True)
 
-        binary_name = self.__get_binary_name()
+        binary_name = _BINARY_NAME
         full_binary_path = os.path.join(target_path, binary_name)
-
-        if not os.path.exists(full_binary_path):
-            zip_path = os.path.join(binaries_path, self.__get_archive_name())
-            logger.info(f"Extracting binary from {zip_path} to {target_path}")
-            self.__extract_binary(zip_path, target_path)
-            # Make the binary executable
-            os.chmod(full_binary_path, 0o755)
+        # A sentinel is written once extraction has finished, so a binary left
+        # half-written by an interrupted extraction is never used
+        if not XmlPowerToolsEngine.__is_extracted(target_path):
+            # Workers starting together would otherwise extract over each other;
+            # the first one extracts while the rest wait on the lock
+            with open(os.path.join(target_path, ".extract.lock"), "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if not XmlPowerToolsEngine.__is_extracted(target_path):
+                    zip_path = XmlPowerToolsEngine.__get_archive_path()
+                    if not os.path.exists(zip_path):
+                        zst_path = zip_path.replace(".tar.gz", ".tar.zst")
+                        if os.path.exists(zst_path):
+                            raise ImportError(
+                                f"zstandard is required to extract {zst_path}"
+                            )
+                        raise FileNotFoundError(f"Binary archive not found: {zip_path}")
+                    logger.info(f"Extracting binary from {zip_path} to {target_path}")
+                    # Drop the sentinel and binary of an earlier archive. The
+                    # binary may still be running in another worker, so it is
+                    # unlinked, as it can't be opened for writing.
+                    for name in os.listdir(target_path):
+                        if name.startswith(".extracted-") or name == binary_name:
+                            os.remove(os.path.join(target_path, name))
+                    XmlPowerToolsEngine.__extract_binary(
+                        zip_path, target_path, binary_name
+                    )
+                    # Make the binary executable
+                    os.chmod(full_binary_path, 0o755)
+                    open(
+                        XmlPowerToolsEngine.__get_sentinel_path(target_path, zip_path),
+                        "w",
+                    ).close()
 
         return full_binary_path
 
-    def __extract_binary(self, zip_path: str, target_path: str):
-        if zip_path.endswith(".zip"):
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                zip_ref.extractall(target_path)
-        elif zip_path.endswith(".tar.gz"):
-            with tarfile.open(zip_path, "r:gz") as tar_ref:
-                tar_ref.extractall(target_path)
-
-    def __get_binary_name(self):
-        os_name = platform.system().lower()
-        if os_name == "windows":
-            return "redlines.exe"
-        return "redlines"
-
-    def __get_archive_name(self):
-        os_name = platform.system().lower()
-        arch = platform.machine().lower()
-
-        if arch in ("x86_64", "amd64"):
-            arch = "x64"
-        elif arch in ("arm64", "aarch64"):
-            arch = "arm64"
-        else:
-            raise EnvironmentError(f"Unsupported architecture: {arch}")
-
-        if os_name == "linux":
-            return f"linux-{arch}-{__version__}.tar.gz"
-        elif os_name == "windows":
-            return f"win-{arch}-{__version__}.zip"
-        elif os_name == "darwin":
-            return f"osx-{arch}-{__version__}.tar.gz"
-        else:
-            raise EnvironmentError("Unsupported OS")
+    @staticmethod
+    def __get_archive_path() -> str:
+        zip_path = os.path.join(
+            _BINARIES_PATH, XmlPowerToolsEngine.__get_binaries_info()[1]
+        )
+        # A zstd build of the tarball decompresses several times faster; use it
+        # when shipped and zstandard is installed
+        zst_path = zip_path.replace(".tar.gz", ".tar.zst")
+        if (
+            zst_path != zip_path
+            and os.path.exists(zst_path)
+            and importlib.util.find_spec("zstandard") is not None
+        ):
+            return zst_path
+        return zip_path
+
+    @staticmethod
+    def __get_sentinel_path(target_path: str, archive_path: str) -> str:
+        # Names the version and the archive's size and mtime, so an archive
+        # rebuilt without a version bump is extracted again
+        stat = os.stat(archive_path)
+        return os.path.join(
+            target_path,
+            f".extracted-{__version__}-{stat.st_size:x}-{stat.st_mtime_ns:x}",
+        )
+
+    @staticmethod
+    def __is_extracted(target_path: str) -> bool:
+        archive_path = XmlPowerToolsEngine.__get_archive_path()
+        if os.path.exists(archive_path):
+            return os.path.exists(
+                XmlPowerToolsEngine.__get_sentinel_path(target_path, archive_path)
+            )
+        # Deployments may leave the archives out once the binary is extracted
+        # at build time; with nothing to compare against, any finished
+        # extraction of this version counts
+        try:
+            return any(
+                name.startswith(f".extracted-{__version__}-")
+                for name in os.listdir(target_path)
+            )
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def __extract_binary(zip_path: str, target_path: str, binary_name: str):
+        # A self-contained single-file build needs only the binary, so that
+        # one member is streamed out instead of unpacking the whole archive.
+        # Debug symbols can be left behind, but any other file (such as the
+        # .dll/.json files of a framework-dependent build) is needed at
+        # runtime, and then the whole archive is extracted after all.
+        binary_path = os.path.join(target_path, binary_name)
+
+        def is_sibling(name: str) -> bool:
+            name = os.path.normpath(name)
+            return name != binary_name and not name.endswith(_NON_RUNTIME_SUFFIXES)
+
+        try:
+            if zip_path.endswith(".zip"):
+                with zipfile.ZipFile(zip_path, "r") as zip_ref:
+                    # The member list comes from the central directory, so the
+                    # layout is known before anything is written
+                    members = [info for info in zip_ref.infolist() if not info.is_dir()]
+                    if any(is_sibling(info.filename) for info in members):
+                        logger.info(f"{zip_path} is not a single-file build")
+                        zip_ref.extractall(target_path)
+                    else:
+                        for info in members:
+                            if os.path.normpath(info.filename) == binary_name:
+                                with zip_ref.open(info) as src, open(
+                                    binary_path, "wb"
+                                ) as dst:
+                                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            elif zip_path.endswith((".tar.gz", ".tar.zst")):
+                # Stream mode reads the archive front to back without seeking,
+                # so the layout is only known as members come; on the first
+                # sibling the archive is read again and extracted whole
+                with _open_tar_stream(zip_path) as tar_ref:
+                    single_file = True
+                    for member in tar_ref:
+                        if member.isdir():
+                            continue
+                        if is_sibling(member.name):
+                            single_file = False
+                            break
+                        if os.path.normpath(member.name) == binary_name:
+                            with tar_ref.extractfile(member) as src, open(
+                                binary_path, "wb"
+                            ) as dst:
+                                shutil.copyfileobj(src, dst, 1024 * 1024)
+                if not single_file:
+                    import tarfile
+
+                    logger.info(f"{zip_path} is not a single-file build")
+                    with _open_tar_stream(zip_path) as tar_ref:
+                        # The data filter (where available) refuses absolute
+                        # paths, links out of target_path and special files
+                        if hasattr(tarfile, "data_filter"):
+                            tar_ref.extractall(target_path, filter="data")
+                        else:
+                            tar_ref.extractall(target_path)
+        except BaseException:
+            # Leave no partial binary behind; the sentinel is never written
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(binary_path)
+            raise
+        if not os.path.isfile(binary_path):
+            raise FileNotFoundError(f"{binary_name} not found in {zip_path}")
+
+    @staticmethod
+    def __get_binaries_info() -> Tuple[str, str]:
+        # Precomputed at import; on an unsupported platform this raises instead
+        if _PLATFORM_TAG is None:
+            return _binaries_info()
+        return _PLATFORM_TAG, _ARCHIVE_NAME
 
     def run_redline(
         self,
         author_tag: str,
         original: Union[bytes, Path],
         modified: Union[bytes, Path],
+        capture_stdout: bool = True,
     ) -> Tuple[bytes, Optional[str], Optional[str]]:
-        temp_files = []
+        # Without capture_stdout the binary's stdout goes to /dev/null and None
+        # is returned for it; stderr is always kept to report failures
+        return self._redline(
+            author_tag, original, modified, capture_stdout=capture_stdout
+        )
+
+    def run_redline_to_path(
+        self,
+        author_tag: str,
+        original: Union[bytes, Path],
+        modified: Union[bytes, Path],
+        output_path: Union[str, Path],
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Like run_redline, but the binary writes the redlined document straight
+        to output_path, so it never passes through Python. Returns the binary's
+        stdout and stderr.
+        """
+        _, stdout, stderr = self._redline(
+            author_tag, original, modified, str(output_path)
+        )
+        return stdout, stderr
+
+    def _redline(
+        self,
+        author_tag: str,
+        original: Union[bytes, Path],
+        modified: Union[bytes, Path],
+        target: Optional[str] = None,
+        capture_stdout: bool = True,
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        if XmlPowerToolsEngine._pipes_supported:
+            try:
+                return self._run_redline_piped(
+                    author_tag, original, modified, target, capture_stdout
+                )
+            except subprocess.CalledProcessError:
+                # Only give up on pipes if the same job succeeds from real files,
+                # otherwise the document itself is the problem
+                result = self._run_redline_with_files(
+                    author_tag, original, modified, target, capture_stdout
+                )
+                logger.warning(
+                    "Redline binary rejected /dev/fd pipes, using temp files from now on"
+                )
+                XmlPowerToolsEngine._pipes_supported = False
+                self._discard_spares()
+                return result
+
+        return self._run_redline_with_files(
+            author_tag, original, modified, target, capture_stdout
+        )
+
+    def _run_redline_piped(
+        self,
+        author_tag: str,
+        original: Union[bytes, Path],
+        modified: Union[bytes, Path],
+        target: Optional[str] = None,
+        capture_stdout: bool = True,
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        # Hand the binary /dev/fd/N paths backed by kernel pipes so neither the
+        # inputs nor the redlined output ever touch the filesystem
+        sources = tuple(
+            None if isinstance(source, bytes) else source
+            for source in (original, modified)
+        )
+        process = None
+        # Spares read both inputs and write the output through pipes
+        use_spares = sources == (None, None) and target is None
+        if use_spares:
+            # Use a process that already paid the runtime startup while idle
+            process = self._take_spare(author_tag, capture_stdout)
+        if process is None:
+            process = _PipedRedlineProcess(
+                self.extracted_binaries_path,
+                author_tag,
+                sources,
+                target,
+                capture_stdout,
+            )
+
+        try:
+            return process.run(
+                [source for source in (original, modified) if isinstance(source, bytes)]
+            )
+        finally:
+            if use_spares:
+                # Top the pool back up in the background so the next requests
+                # find one too; only now, so the new spares don't compete for
+                # CPU with this redline
+                self._request_spares(author_tag, capture_stdout)
+
+    def _request_spares(self, author_tag: str, capture_stdout: bool = True):
+        # The spares are an optimization, so failing to schedule them (as
+        # during interpreter shutdown) must never fail the caller's redline
+        try:
+            _spare_executor.submit(self._start_spares, author_tag, capture_stdout)
+        except Exception as e:
+            logger.debug(f"Not starting spare redline processes: {e}")
+
+    def _take_spare(
+        self, author_tag: str, capture_stdout: bool = True
+    ) -> Optional["_PipedRedlineProcess"]:
+        key = (self.extracted_binaries_path, author_tag, capture_stdout)
+        with XmlPowerToolsEngine._spares_lock:
+            pool = XmlPowerToolsEngine._spares.get(key)
+            spare = pool.pop()[1] if pool else None
+        if spare is not None and spare.process.poll() is not None:
+            # Died while idle; its stderr is lost, so just run a fresh one
+            logger.warning(
+                f"Spare redline process exited early: {spare.process.returncode}"
+            )
+            spare.discard()
+            return None
+        return spare
+
+    def _start_spares(self, author_tag: str, capture_stdout: bool = True):
+        # Runs on _spare_executor. Processes are launched outside the lock, so
+        # requests taking spares never wait on a launch.
+        cls = XmlPowerToolsEngine
+        key = (self.extracted_binaries_path, author_tag, capture_stdout)
+        with cls._spares_lock:
+            if not cls._pipes_supported:
+                return
+            idle = sum(len(pool) for pool in cls._spares.values())
+            wanted = min(
+                self.spare_processes - len(cls._spares[key]),
+                _MAX_SPARE_PROCESSES - idle,
+            )
+
+        started = []
+        for _ in range(wanted):
+            try:
+                started.append(
+                    _PipedRedlineProcess(
+                        self.extracted_binaries_path,
+                        author_tag,
+                        capture_stdout=capture_stdout,
+                    )
+                )
+            except OSError as e:
+                logger.warning(f"Could not start spare redline process: {e}")
+                break
+        if not started:
+            return
+
+        with cls._spares_lock:
+            # Pipes may have been given up on while these were starting
+            if cls._pipes_supported:
+                now = time.monotonic()
+                cls._spares[key].extend((now, spare) for spare in started)
+                started = []
+                cls._schedule_spare_reaper()
+        for spare in started:
+            spare.discard()
+
+    @classmethod
+    def _schedule_spare_reaper(cls):
+        # Called with _spares_lock held
+        if cls._spare_reaper is None:
+            cls._spare_reaper = threading.Timer(_SPARE_IDLE_SECONDS, cls._reap_spares)
+            cls._spare_reaper.daemon = True
+            cls._spare_reaper.start()
+
+    @classmethod
+    def _reap_spares(cls):
+        deadline = time.monotonic() - _SPARE_IDLE_SECONDS
+        stale = []
+        with cls._spares_lock:
+            for pool in cls._spares.values():
+                stale.extend(
+                    spare for idle_since, spare in pool if idle_since < deadline
+                )
+                pool[:] = [entry for entry in pool if entry[0] >= deadline]
+            cls._spare_reaper = None
+            if any(cls._spares.values()):
+                cls._schedule_spare_reaper()
+        for spare in stale:
+            spare.discard()
+
+    @classmethod
+    def _discard_spares(cls):
+        # Every engine's spares, since giving up on pipes applies to them all
+        with cls._spares_lock:
+            spares = [spare for pool in cls._spares.values() for _, spare in pool]
+            cls._spares.clear()
+        for spare in spares:
+            spare.discard()
+
+    def _run_redline_with_files(
+        self,
+        author_tag: str,
+        original: Union[bytes, Path],
+        modified: Union[bytes, Path],
+        target: Optional[str] = None,
+        capture_stdout: bool = True,
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        # Each call gets its own directory inside the engine's scratch
+        # directory, so its files need no unique names and are released together
+        call_dir = self._acquire_call_dir()
         try:
-            target_path = tempfile.NamedTemporaryFile(delete=False).name
+            target_path = target or os.path.join(call_dir, "redline.docx")
             original_path = (
-                self._write_to_temp_file(original)
+                self._write_to_temp_file(
+                    original, os.path.join(call_dir, "original.docx")
+                )
                 if isinstance(original, bytes)
                 else original
             )
             modified_path = (
-                self._write_to_temp_file(modified)
+                self._write_to_temp_file(
+                    modified, os.path.join(call_dir, "modified.docx")
+                )
                 if isinstance(modified, bytes)
                 else modified
             )
-            temp_files.extend([target_path, original_path, modified_path])
 
             command = [
                 self.extracted_binaries_path,
@@ -137,9 +911,8 @@ class XmlPowerToolsEngine(object):
                 result = subprocess.run(
                     command,
                     check=True,
-                    stdout=subprocess.PIPE,
+                    stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
                     stderr=subprocess.PIPE,
-                    text=True,
                     timeout=60,  # Add 60-second timeout
                 )
             except subprocess.TimeoutExpired:
@@ -148,36 +921,52 @@ class XmlPowerToolsEngine(object):
                     "Redline generation timed out. The document may be too large or complex."
                 )
 
-            stdout_output = (
-                result.stdout
-                if isinstance(result.stdout, str) and len(result.stdout) > 0
-                else None
-            )
-            stderr_output = (
-                result.stderr
-                if isinstance(result.stderr, str) and len(result.stderr) > 0
-                else None
-            )
+            stdout_output = _decode_output(result.stdout)
+            stderr_output = _decode_output(result.stderr)
 
-            redline_output = Path(target_path).read_bytes()
+            redline_output = None if target else Path(target_path).read_bytes()
 
             return redline_output, stdout_output, stderr_output
 
         finally:
-            self._cleanup_temp_files(temp_files)
+            self._release_call_dir(call_dir)
 
-    def _cleanup_temp_files(self, temp_files):
-        for file_path in temp_files:
-            try:
-                os.remove(file_path)
-            except OSError as e:
-                print(f"Error deleting temp file {file_path}: {e}")
+    def _get_scratch_dir(self) -> str:
+        with self._scratch_lock:
+            if self._scratch_dir is None:
+                self._scratch_dir = tempfile.mkdtemp(prefix="redlines-", dir=_TEMP_DIR)
+                atexit.register(shutil.rmtree, self._scratch_dir, ignore_errors=True)
+            return self._scratch_dir
 
-    def _write_to_temp_file(self, data):
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        temp_file.write(data)
-        temp_file.close()
-        return temp_file.name
+    def _acquire_call_dir(self) -> str:
+        with self._scratch_lock:
+            if self._free_call_dirs:
+                return self._free_call_dirs.pop()
+        return tempfile.mkdtemp(dir=self._get_scratch_dir())
+
+    def _release_call_dir(self, call_dir: str):
+        # Only the call's own directory is touched; inputs passed in as paths
+        # belong to the caller
+        with self._scratch_lock:
+            if len(self._free_call_dirs) < _MAX_FREE_CALL_DIRS:
+                # Truncate rather than delete, so the documents don't linger
+                # in RAM-backed storage but the files stay for the next call
+                try:
+                    for entry in os.scandir(call_dir):
+                        os.truncate(entry.path, 0)
+                except OSError as e:
+                    logger.warning(f"Error truncating temp files in {call_dir}: {e}")
+                else:
+                    self._free_call_dirs.append(call_dir)
+                    return
+        # Removal runs in the background so the redline result is returned
+        # without waiting on the filesystem
+        _cleanup_executor.submit(_remove_temp_dir, call_dir)
+
+    def _write_to_temp_file(self, data: bytes, path: str) -> str:
+        with open(path, "wb") as temp_file:
+            temp_file.write(data)
+        return path
 
 
 class AdvancedDocumentProcessor:
@@ -187,20 +976,63 @@ class AdvancedDocumentProcessor:
     """
 
     @staticmethod
-    def apply_changes_to_document(doc_content: bytes, changes: List[Dict]) -> bytes:
+    def parse_document(doc_content: bytes):
+        """
+        Parse the main document part (word/document.xml) of a docx
+
+        Parse once and pass the result to extract_text and
+        apply_changes_to_document to avoid re-reading the same document.
+
+        Args:
+            doc_content: The content of the document
+
+        Returns:
+            The lxml root element of the document part
+        """
+        return _load_document_xml(doc_content)
+
+    @staticmethod
+    def extract_text(document) -> str:
+        """
+        Extract the text of the document's top-level body paragraphs, one per
+        line
+
+        Reads the XML directly in a single pass. Paragraphs inside tables and
+        text boxes are left out, although apply_changes_to_document matches
+        text in them too. Each paragraph reads like python-docx's
+        Paragraph.text: tabs as "\t", line breaks as "\n", and page and column
+        breaks as nothing.
+
+        Args:
+            document: The document part as returned by parse_document
+
+        Returns:
+            The paragraph text joined with newlines
+        """
+        body = document.find(f"{_W}body")
+        return "\n".join(_paragraph_text(para) for para in body.iterchildren(f"{_W}p"))
+
+    @staticmethod
+    def apply_changes_to_document(
+        doc_content: bytes, changes: List[Dict], document=None
+    ) -> Tuple[bytes, bool]:
         """
         Apply the specified changes to a document while preserving formatting
 
         Args:
             doc_content: The content of the original document
             changes: List of changes with 'original_text' and 'new_text' keys
+            document: The already parsed document part of doc_content, if any
+                (from parse_document); it is modified in place
 
         Returns:
-            BytesIO object with the modified document
+            Tuple of the modified document bytes and whether any change was
+            applied (if not, the original bytes are returned as-is)
         """
         try:
-            # Load the document
-            doc = Document(BytesIO(doc_content))
+            # Load the main document part, unless the caller already has
+            if document is None:
+                document = _load_document_xml(doc_content)
 
             # Add debugging to inspect the changes
             logger.info(f"Processing {len(changes)} changes")
@@ -233,6 +1065,10 @@ class AdvancedDocumentProcessor:
                 orig = orig.strip().replace("\r\n", "\n")
                 new = new.strip().replace("\r\n", "\n")
 
+                if not orig:
+                    logger.warning("Skipping change with empty original text")
+                    continue
+
                 # Debug the original and new text
                 logger.info(f"Original text: {orig[:50]}...")
                 logger.info(f"New text: {new[:50]}...")
@@ -241,89 +1077,108 @@ class AdvancedDocumentProcessor:
 
             logger.info(f"Normalized {len(normalized_changes)} changes for processing")
 
-            # Sort changes by length (longest first) to avoid partial replacements
-            sorted_changes = sorted(
-                normalized_changes, key=lambda x: len(x["original_text"]), reverse=True
-            )
-
             # Track if any changes were made
             changes_made = False
 
-            # Extract all text from the document to make finding exact matches easier
-            all_paragraphs = []
-            for i, para in enumerate(doc.paragraphs):
-                if para.text.strip():
-                    all_paragraphs.append(
-                        {
-                            "type": "paragraph",
-                            "index": i,
-                            "text": para.text,
-                            "object": para,
-                        }
-                    )
+            # Extract the text of every paragraph in the body, including table
+            # cells, in one pass over the XML. Texts and elements are kept in
+            # parallel lists so the scan below only touches the strings.
+            texts = []
+            elements = []
+            for para in document.iter(f"{_W}p"):
+                text = _paragraph_text(para)
+                if text.strip():
+                    texts.append(text)
+                    elements.append(para)
 
-            # Extract table text
-            for t_idx, table in enumerate(doc.tables):
-                for r_idx, row in enumerate(table.rows):
-                    for c_idx, cell in enumerate(row.cells):
-                        for p_idx, para in enumerate(cell.paragraphs):
-                            if para.text.strip():
-                                all_paragraphs.append(
-                                    {
-                                        "type": "table_cell",
-                                        "table_index": t_idx,
-                                        "row_index": r_idx,
-                                        "cell_index": c_idx,
-                                        "para_index": p_idx,
-                                        "text": para.text,
-                                        "object": para,
-                                    }
-                                )
-
-            logger.info(f"Extracted {len(all_paragraphs)} text elements for matching")
-
-            # Find and apply exact matches
-            for change in sorted_changes:
-                original_text = change["original_text"]
-                new_text = change["new_text"]
-                found_match = False
-
-                for para_info in all_paragraphs:
-                    if original_text in para_info["text"]:
-                        # Found a match - replace the text
-                        paragraph = para_info["object"]
-                        modified_text = para_info["text"].replace(
-                            original_text, new_text
-                        )
-
-                        if modified_text != para_info["text"]:
-                            # Clear and replace the text
-                            paragraph.clear()
-                            paragraph.add_run(modified_text)
-
-                            # Update the text in our tracking structure for future matches
-                            para_info["text"] = modified_text
-
-                            changes_made = True
-                            found_match = True
-
-                            logger.info(
-                                f"Applied change to {para_info['type']} - replaced: {original_text[:30]}... with: {new_text[:30]}..."
-                            )
+            logger.info(f"Extracted {len(texts)} text elements for matching")
+
+            # Map each original text to its replacement (first suggestion wins
+            # on duplicates) and compile them into one alternation. Since the
+            # alternatives are ordered longest first, the regex engine picks the
+            # longest original at each position, so overlapping originals never
+            # cause partial replacements, and every paragraph is scanned once
+            # instead of once per change. Only the distinct originals are sorted.
+            replacements = {}
+            for change in normalized_changes:
+                replacements.setdefault(change["original_text"], change["new_text"])
+            pattern = re.compile(
+                "|".join(map(re.escape, sorted(replacements, key=len, reverse=True)))
+            )
+
+            # Join the paragraphs with NUL (which can't occur in docx text, so no
+            # match can span two paragraphs) and record where each one starts.
+            # The whole document is scanned once and each hit is bucketed back to
+            # its paragraph by offset, so paragraphs without hits are never
+            # visited again.
+            document_text = "\x00".join(texts)
+            paragraph_starts = list(
+                itertools.accumulate((len(text) + 1 for text in texts), initial=0)
+            )
+            hits_by_paragraph = defaultdict(list)
+            if replacements:
+                for match in pattern.finditer(document_text):
+                    index = bisect.bisect_right(paragraph_starts, match.start()) - 1
+                    hits_by_paragraph[index].append(match)
+            matched_texts = set()
+
+            # Apply the exact matches
+            for index, matches in hits_by_paragraph.items():
+                text = texts[index]
+                offset = paragraph_starts[index]
+                pieces = []
+                edits = []
+                position = 0
+                for match in matches:
+                    start, end = match.start() - offset, match.end() - offset
+                    new_text = replacements[match.group()]
+                    pieces.append(text[position:start])
+                    pieces.append(new_text)
+                    edits.append((start, end, new_text))
+                    position = end
+                    matched_texts.add(match.group())
+                pieces.append(text[position:])
+                modified_text = "".join(pieces)
 
-                if not found_match:
+                if modified_text != text:
+                    # Edit the matched text where it sits so the runs keep their
+                    # formatting; only clear and replace the whole paragraph when
+                    # that isn't possible
+                    para = elements[index]
+                    if not _replace_in_runs(para, edits):
+                        _set_paragraph_text(para, modified_text)
+                    texts[index] = modified_text
+
+                    changes_made = True
+
+                    kind = (
+                        "table_cell"
+                        if para.getparent().tag == f"{_W}tc"
+                        else "paragraph"
+                    )
+                    logger.info(
+                        f"Applied changes to {kind} - now reads: {modified_text[:30]}..."
+                    )
+
+            for original_text in replacements:
+                if original_text not in matched_texts:
                     logger.warning(f"No match found for text: {original_text[:50]}...")
 
             if not changes_made:
                 logger.warning("No changes were applied to the document")
-            else:
-                logger.info(f"Successfully applied changes to the document")
+                return doc_content, False
+
+            logger.info(f"Successfully applied changes to the document")
 
             # Save the modified document to memory
-            output = BytesIO()
-            doc.save(output)
-            output.seek(0)
-            return output.getvalue()
+            modified_doc = _replace_docx_part(
+                doc_content,
+                _DOCUMENT_PART,
+                etree.tostring(
+                    document, xml_declaration=True, encoding="UTF-8", standalone=True
+                ),
+            )
+            return modified_doc, True
 
         except Exception as e:
             logger.error(f"Error applying changes to document: {str(e)}")
@@ -331,7 +1186,10 @@ class AdvancedDocumentProcessor:
 
     @staticmethod
     def process_document_with_redlining(
-        doc_content: bytes, changes: List[Dict], author_tag: str = "NDA Review"
+        doc_content: bytes,
+        changes: List[Dict],
+        author_tag: str = "NDA Review",
+        document=None,
     ) -> bytes:
         """
         Process a document by applying changes and creating a redlined version
@@ -341,26 +1199,31 @@ class AdvancedDocumentProcessor:
             doc_content: The content of the original document
             changes: List of changes to apply
             author_tag: Author tag for the redlining
+            document: The already parsed document part of doc_content, if any
+                (from parse_document); it is modified in place
 
         Returns:
             bytes containing the redlined document
         """
         try:
             # First apply changes to get the modified document
-            modified_doc = AdvancedDocumentProcessor.apply_changes_to_document(
-                doc_content, changes
+            modified_doc, changes_made = (
+                AdvancedDocumentProcessor.apply_changes_to_document(
+                    doc_content, changes, document
+                )
             )
 
-            # Create BytesIO objects for both documents
-            original_io = BytesIO(doc_content)
-            modified_io = BytesIO(modified_doc)
+            # Nothing matched, so there is nothing to redline
+            if not changes_made:
+                logger.info("Skipping redline, document is unchanged")
+                return doc_content
 
-            # Use the XmlPowerToolsEngine to create the redlined version
-            redline_engine = XmlPowerToolsEngine()
-            redlined_doc, stdout, stderr = redline_engine.run_redline(
+            # Use the shared XmlPowerToolsEngine to create the redlined version
+            redlined_doc, _, stderr = _engine.run_redline(
                 author_tag=author_tag,
-                original=original_io.getvalue(),
-                modified=modified_io.getvalue(),
+                original=doc_content,
+                modified=modified_doc,
+                capture_stdout=False,
             )
 
             if stderr:
@@ -371,3 +1234,15 @@ class AdvancedDocumentProcessor:
         except Exception as e:
             logger.error(f"Error in document redlining process: {str(e)}")
             raise
+
+
+# Shared engine, built at import so binary lookup/extraction happens once per
+# process instead of on every redline request
+_engine = XmlPowerToolsEngine()
+
+
+if __name__ == "__main__":
+    # Build step: run `python advanced_redliner.py` while packaging so the
+    # binary is already extracted into bin/<platform>-<arch>/ and cold starts
+    # only have to exec it
+    print(_engine.extracted_binaries_path)
@@ -1,19 +1,25 @@
 from flask import Flask, request, jsonify, send_file, render_template
-from docx import Document
-from io import BytesIO
+from flask.json.provider import JSONProvider
 import logging
 import os
-import json
+import re
+import orjson
 import base64
 from dotenv import load_dotenv
 from datetime import datetime
+from typing import Union
 import hmac
 import hashlib
 import uuid
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import openai
 from packaging import version
 from openai import OpenAI
 from advanced_redliner import AdvancedDocumentProcessor  # Import the advanced redliner
+from doc_store import DocStore
 
 # Load environment variables
 load_dotenv()
@@ -24,17 +30,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider for jsonify and request.get_json backed by orjson"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Same arguments as jsonify: one value, several positional values as a
+        # list, or keyword arguments as a dict
+        if args and kwargs:
+            raise TypeError("response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = list(args) if args else kwargs
+        # Hand orjson's bytes straight to the response, skipping the str round trip
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
 # Initialize Flask app
 application = Flask(__name__)
+application.json = OrjsonProvider(application)
 app = application  # Add this line to make app available for gunicorn
 
 # Get OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = "gpt-4"  # Using constant model name
+# Most documents only need exact clauses pulled out and matched against the
+# checklist, which the small model handles; the larger one is kept for
+# responses that fail validation. Both must support JSON mode.
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_FALLBACK_MODEL = "gpt-4o"
+# Share of suggested changes whose original_text may be missing from the NDA
+# before the response is retried with the fallback model
+OPENAI_MAX_UNMATCHED_RATIO = 0.3
 
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable is not set")
 
+# Webhook key, read and encoded once instead of on every webhook call
+BREVO_WEBHOOK_KEY = os.getenv("BREVO_WEBHOOK_KEY", "").encode("utf-8")
+
 # Detect OpenAI version
 openai_version = getattr(openai, "__version__", "0.0.0")
 
@@ -53,41 +95,72 @@ else:
     logger.info(f"Using OpenAI client v0.x (version {openai_version})")
 
 
+# NDA processing runs in background threads so a slow OpenAI call or redline
+# doesn't pin a gunicorn worker; clients poll /status/<job_id> for the outcome.
+# Job records are kept in the document store, so any worker can answer a poll.
+JOB_WORKERS = int(os.getenv("NDA_JOB_WORKERS", "4"))
+JOB_TTL_SECONDS = 3600
+# A queued or running job whose record hasn't been updated for this long is
+# reported as failed, since the worker running it has most likely died
+JOB_STALE_SECONDS = 15 * 60
+# Concurrent OpenAI requests when several NDAs are submitted together
+OPENAI_BATCH_CONCURRENCY = 10
+# Concurrent redlines across all batches of NDAs
+REDLINE_CONCURRENCY = os.cpu_count() or 1
+# Long NDAs are split on paragraph boundaries into chunks of roughly this many
+# characters (~1500 tokens) which are analyzed in parallel
+NDA_CHUNK_CHARS = 6000
+# Cap on in-flight OpenAI requests across all jobs, to stay under the rate limit
+OPENAI_MAX_CONCURRENT_REQUESTS = 8
+openai_semaphore = threading.BoundedSemaphore(OPENAI_MAX_CONCURRENT_REQUESTS)
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+# Redlines the documents of batch jobs; shared so that concurrent batches
+# together stay within REDLINE_CONCURRENCY binary processes
+redline_executor = ThreadPoolExecutor(max_workers=REDLINE_CONCURRENCY)
+
+
+# Redlined documents are kept on disk so every gunicorn worker can serve
+# downloads, with expiry and LRU eviction keeping the store bounded
+doc_store = DocStore(
+    os.getenv(
+        "NDA_DOC_STORE_DIR", os.path.join(tempfile.gettempdir(), "nda_redline_docs")
+    ),
+    size_limit=int(os.getenv("NDA_DOC_STORE_SIZE_LIMIT", str(1024 * 1024 * 1024))),
+    ttl=JOB_TTL_SECONDS,
+)
+doc_store.start_cleanup(interval=60)
+
+# Job records, read by /status/<job_id> from whichever worker gets the poll.
+# Reads don't refresh them, so each expires JOB_TTL_SECONDS after its last update
+job_store = DocStore(
+    os.getenv(
+        "NDA_JOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "nda_redline_jobs")
+    ),
+    size_limit=int(os.getenv("NDA_JOB_STORE_SIZE_LIMIT", str(64 * 1024 * 1024))),
+    ttl=JOB_TTL_SECONDS,
+)
+job_store.start_cleanup(interval=60)
+
+# OpenAI results per NDA chunk, keyed by a hash of everything in the prompt, so
+# resubmitted NDAs and shared boilerplate skip the model entirely
+ANALYSIS_CACHE_TTL_SECONDS = 24 * 3600
+analysis_cache = DocStore(
+    os.getenv(
+        "NDA_ANALYSIS_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "nda_analysis_cache"),
+    ),
+    size_limit=int(os.getenv("NDA_ANALYSIS_CACHE_SIZE_LIMIT", str(64 * 1024 * 1024))),
+    ttl=ANALYSIS_CACHE_TTL_SECONDS,
+)
+analysis_cache.start_cleanup(interval=600)
+
+
 class NDAProcessingError(Exception):
     """Custom exception for NDA processing errors"""
 
     pass
 
 
-def apply_changes_to_document(doc: Document, changes: list) -> Document:
-    """Apply changes directly to document paragraphs while preserving formatting"""
-    changes_made = False
-
-    for paragraph in doc.paragraphs:
-        original_text = paragraph.text
-        modified_text = original_text
-
-        for change in changes:
-            if change["original_text"] in modified_text:
-                modified_text = modified_text.replace(
-                    change["original_text"], change["new_text"]
-                )
-                changes_made = True
-                logger.info(
-                    f"Applied change: {change['original_text']} → {change['new_text']}"
-                )
-
-        if modified_text != original_text:
-            # Clear the paragraph and add new text with formatting
-            paragraph.clear()
-            paragraph.add_run(modified_text)
-
-    if not changes_made:
-        logger.warning("No changes were applied to the document")
-
-    return doc
-
-
 def load_nda_checklist() -> str:
     """Load NDA Checklist text directly from file"""
     try:
@@ -103,25 +176,23 @@ def load_nda_checklist() -> str:
         return "Error loading NDA Checklist"
 
 
-def analyze_nda_with_openai(nda_text: str) -> dict:
-    """Analyze NDA text using OpenAI"""
-    try:
-        # Load checklist and prepare prompt
-        checklist_content = load_nda_checklist()
-
-        # Get current date in standard legal format
-        current_date = datetime.now().strftime("%B %d, %Y")
+# The checklist doesn't change while the app runs, so read it once and bake it
+# into the static part of the analysis prompt; only the NDA text and the date
+# vary per request
+NDA_CHECKLIST = load_nda_checklist()
 
-        prompt = f"""
+NDA_PROMPT_HEAD = f"""
         EXACT TEXT MATCHING NDA REVIEW
 
         This is a specialized NDA review task where EXACT text matching is CRITICAL. The document processing system can ONLY find and replace text that matches EXACTLY character-for-character.
 
         NDA CHECKLIST:
-        {checklist_content}
+        {NDA_CHECKLIST}
 
-        NDA TEXT:
-        {nda_text}
+        NDA TEXT (each paragraph is wrapped in numbered <<Pn>>...<</Pn>> markers):
+        """
+
+NDA_PROMPT_TAIL = """
 
         YOUR TASK:
         1. BE COMPREHENSIVE - Find ALL sections in the NDA that could benefit from changes
@@ -143,6 +214,7 @@ def analyze_nda_with_openai(nda_text: str) -> dict:
         - Be THOROUGH - try to find matches for EVERY item in our checklist
         - For each checklist item, try to find multiple places where changes could be made
         - Keep each individual change focused and surgical (don't rewrite entire paragraphs)
+        - Each original_text must lie within a single <<Pn>> paragraph and must NOT include the <<Pn>> or <</Pn>> markers
 
         RESPONSE FORMAT:
         Your response must be a valid JSON object with a "changes" array containing objects with these exact fields:
@@ -153,33 +225,178 @@ def analyze_nda_with_openai(nda_text: str) -> dict:
         TECHNICAL NOTE: Our text replacement system uses simple string matching. The text you provide as original_text will be searched for in the document and replaced with new_text only if it matches exactly. There is no fuzzy matching or pattern matching capability.
         """
 
+
+# Hash of the static prompt and models, folded into every analysis cache key so
+# a checklist or model change invalidates cached results
+NDA_PROMPT_DIGEST = hashlib.sha256(
+    "\0".join(
+        (NDA_PROMPT_HEAD, NDA_PROMPT_TAIL, OPENAI_MODEL, OPENAI_FALLBACK_MODEL)
+    ).encode("utf-8")
+).digest()
+
+# Paragraph delimiters in the prompt, stripped from anything echoed back
+PARAGRAPH_MARKER = re.compile(r"<</?P\d+>>")
+
+
+def mark_nda_paragraphs(nda_text: str) -> str:
+    """Wrap each non-empty paragraph in numbered <<Pn>>...<</Pn>> markers"""
+    paragraphs = [p for p in nda_text.split("\n") if p.strip()]
+    return "\n".join(
+        f"<<P{i}>>{paragraph}<</P{i}>>" for i, paragraph in enumerate(paragraphs, 1)
+    )
+
+
+def split_nda_text(nda_text: str) -> list:
+    """Split NDA text into chunks of whole paragraphs of about NDA_CHUNK_CHARS"""
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in nda_text.split("\n"):
+        if current and size + len(paragraph) > NDA_CHUNK_CHARS:
+            chunks.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(paragraph)
+        size += len(paragraph) + 1
+    chunks.append("\n".join(current))
+    return chunks
+
+
+def analyze_nda_with_openai(nda_text: str) -> dict:
+    """Analyze NDA text using OpenAI, one request per chunk of a long NDA"""
+    chunks = split_nda_text(nda_text)
+    if len(chunks) == 1:
+        return analyze_nda_chunk(nda_text)
+
+    # A single call over a long NDA is bound by decoding one long response;
+    # chunks decode in parallel and their changes are merged afterwards
+    logger.info(f"Analyzing NDA in {len(chunks)} chunks")
+    workers = min(len(chunks), OPENAI_MAX_CONCURRENT_REQUESTS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(analyze_nda_chunk, chunks))
+
+    changes = []
+    seen = set()
+    for result in results:
+        for change in result["changes"]:
+            original_text = change.get("original_text", "")
+            if original_text not in seen:
+                seen.add(original_text)
+                changes.append(change)
+
+    errors = []
+    for index, result in enumerate(results, 1):
+        if "error" in result:
+            logger.error(
+                f"Analysis of NDA chunk {index}/{len(chunks)} failed: {result['error']}"
+            )
+            errors.append(result["error"])
+    if errors and not changes:
+        return {"changes": [], "error": errors[0]}
+    if errors:
+        # The other chunks' changes are still usable, but the result must not
+        # pass for a review of the whole NDA
+        return {
+            "changes": changes,
+            "warning": f"{len(errors)} of {len(chunks)} parts of the NDA could not "
+            "be analyzed, so these suggestions may be incomplete",
+        }
+    return {"changes": changes}
+
+
+def analysis_cache_key(nda_text: str) -> str:
+    """Cache key for the analysis of an NDA chunk on the current date"""
+    # The date is part of the prompt (blank dates get filled in with it)
+    current_date = datetime.now().strftime("%B %d, %Y")
+    digest = hashlib.sha256(NDA_PROMPT_DIGEST)
+    digest.update(current_date.encode("utf-8"))
+    digest.update(nda_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def analyze_nda_chunk(nda_text: str) -> dict:
+    """Analyze NDA text using OpenAI, escalating to the fallback model if needed"""
+    cache_key = analysis_cache_key(nda_text)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Using cached analysis for NDA chunk")
+        return orjson.loads(cached)
+
+    result = request_nda_changes(nda_text, OPENAI_MODEL)
+
+    # Changes can only be applied if their original text is in the document,
+    # so too many misses means the small model got this one wrong
+    changes = result["changes"]
+    unmatched = sum(
+        1 for change in changes if change.get("original_text", "") not in nda_text
+    )
+    if "error" in result or unmatched > len(changes) * OPENAI_MAX_UNMATCHED_RATIO:
+        logger.warning(
+            f"{OPENAI_MODEL} response failed validation "
+            f"({unmatched}/{len(changes)} changes unmatched), "
+            f"retrying with {OPENAI_FALLBACK_MODEL}"
+        )
+        try:
+            fallback = request_nda_changes(nda_text, OPENAI_FALLBACK_MODEL)
+        except NDAProcessingError as e:
+            fallback = {"changes": [], "error": str(e)}
+        if "error" in fallback and "error" not in result:
+            # Changes that don't match are skipped when applied, so the small
+            # model's result is still worth returning, but not caching
+            logger.error(
+                f"{OPENAI_FALLBACK_MODEL} failed ({fallback['error']}), "
+                f"keeping the {OPENAI_MODEL} result"
+            )
+            return result
+        result = fallback
+
+    # Failed analyses are retried on the next submission rather than cached
+    if "error" not in result:
+        analysis_cache.set(cache_key, orjson.dumps(result))
+    return result
+
+
+def request_nda_changes(nda_text: str, model: str) -> dict:
+    """Ask the given OpenAI model for suggested changes to the NDA text"""
+    try:
+        # Get current date in standard legal format
+        current_date = datetime.now().strftime("%B %d, %Y")
+
+        prompt = (
+            NDA_PROMPT_HEAD
+            + mark_nda_paragraphs(nda_text)
+            + NDA_PROMPT_TAIL.format(current_date=current_date)
+        )
+
         # Log the prompt being sent to OpenAI
         logger.info("Sending prompt to OpenAI for NDA analysis (JSON mode requested)")
 
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a legal document reviewer specializing in NDAs. Your task is to analyze legal documents and suggest improvements based on the client's preferred language. Format your output as a JSON array of suggested changes.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.2,
-            response_format={"type": "json_object"},
-        )
+        with openai_semaphore:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a legal document reviewer specializing in NDAs. Your task is to analyze legal documents and suggest improvements based on the client's preferred language. Format your output as a JSON array of suggested changes.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.2,
+                response_format={"type": "json_object"},
+            )
         content = response.choices[0].message.content
 
         # Log the response content for debugging
         logger.info(
             f"OpenAI response received (JSON mode). Content length: {len(content)}"
         )
-        logger.debug(f"Raw JSON response content: {content[:500]}...")
+        # Lazy formatting: the slice is only taken if debug logging is enabled
+        logger.debug("Raw JSON response content: %.500s...", content)
 
         # Parse the response
         try:
             # Parse the JSON response
-            changes_raw = json.loads(content)
+            changes_raw = orjson.loads(content)
             logger.info(f"Successfully parsed JSON from OpenAI response")
 
             # Handle different possible JSON structures
@@ -219,6 +436,10 @@ def analyze_nda_with_openai(nda_text: str) -> dict:
                     or change.get("revised")
                     or change.get("new", "")
                 )
+                # Markers are prompt-only; drop any the model copied along
+                for field in ("original_text", "new_text"):
+                    if isinstance(std_change[field], str):
+                        std_change[field] = PARAGRAPH_MARKER.sub("", std_change[field])
                 std_change["reason"] = change.get("reason") or change.get(
                     "justification", "No reason provided."
                 )
@@ -231,7 +452,7 @@ def analyze_nda_with_openai(nda_text: str) -> dict:
             logger.info(f"Returning {len(valid_changes)} valid changes.")
             return {"changes": valid_changes}
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse OpenAI response as JSON: {e}")
             return {"changes": [], "error": "Failed to parse JSON response from AI"}
         except ValueError as e:
@@ -243,17 +464,44 @@ def analyze_nda_with_openai(nda_text: str) -> dict:
         raise NDAProcessingError(f"Failed to analyze NDA: {str(e)}")
 
 
-def process_nda(docx_content: bytes) -> dict:
+def analyze_ndas_with_openai(nda_texts: list) -> list:
+    """Analyze several NDA texts concurrently, returning results in input order"""
+
+    def analyze(nda_text: str) -> dict:
+        # A failure only fails its own NDA, not the rest of the batch
+        try:
+            return analyze_nda_with_openai(nda_text)
+        except NDAProcessingError as e:
+            return {"changes": [], "error": str(e)}
+        except Exception as e:
+            logger.error(f"Unexpected error analyzing NDA: {str(e)}", exc_info=True)
+            return {"changes": [], "error": f"An unexpected error occurred: {str(e)}"}
+
+    if not nda_texts:
+        return []
+
+    # The calls are network-bound, so overlapping them in threads amortizes the
+    # round-trip latency across the batch
+    workers = min(len(nda_texts), OPENAI_BATCH_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze, nda_texts))
+
+
+def process_nda(
+    docx_content: bytes, analysis_result: dict = None, document=None
+) -> dict:
     """Process NDA document and return changes"""
     try:
-        # Load the document
-        doc = Document(BytesIO(docx_content))
+        # Parse the document once; the same tree provides the text for OpenAI
+        # and receives the changes
+        if document is None:
+            document = AdvancedDocumentProcessor.parse_document(docx_content)
 
-        # Extract text from document
-        nda_text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-
-        # Analyze with OpenAI
-        analysis_result = analyze_nda_with_openai(nda_text)
+        # Analyze with OpenAI, unless a batched analysis already did
+        if analysis_result is None:
+            analysis_result = analyze_nda_with_openai(
+                AdvancedDocumentProcessor.extract_text(document)
+            )
 
         if not analysis_result.get("changes"):
             logger.warning("No changes suggested by OpenAI")
@@ -261,46 +509,160 @@ def process_nda(docx_content: bytes) -> dict:
 
         # Use the advanced document processor to apply changes and generate professional redlines
         redlined_doc = AdvancedDocumentProcessor.process_document_with_redlining(
-            docx_content, analysis_result["changes"], author_tag="NDA Review"
+            docx_content,
+            analysis_result["changes"],
+            author_tag="NDA Review",
+            document=document,
         )
 
         # Generate a unique filename
         filename = f"redlined_nda_{uuid.uuid4().hex[:8]}.docx"
 
-        # Store the document in memory
-        processed_documents = application.config.get("processed_docs", {})
-        processed_documents[filename] = redlined_doc  # Store the bytes directly
-
-        return {
+        result = {
             "changes": analysis_result["changes"],
             "filename": filename,
-            "document": BytesIO(redlined_doc),  # Return BytesIO for immediate use
+            "document": redlined_doc,
         }
+        if "warning" in analysis_result:
+            result["warning"] = analysis_result["warning"]
+        return result
 
     except Exception as e:
         logger.error(f"Error processing NDA: {str(e)}")
         raise NDAProcessingError(f"Failed to process NDA: {str(e)}")
 
 
-def verify_webhook_signature(request_data: str, signature: str) -> bool:
+def verify_webhook_signature(request_data: Union[str, bytes], signature: str) -> bool:
     """Verify the webhook signature from Brevo"""
     if not signature:
         logger.warning("No webhook signature provided")
         return False
 
-    webhook_key = os.getenv("BREVO_WEBHOOK_KEY")
-    if not webhook_key:
+    if not BREVO_WEBHOOK_KEY:
         logger.error("BREVO_WEBHOOK_KEY not set")
         return False
 
-    # Create HMAC signature
-    hmac_obj = hmac.new(
-        webhook_key.encode("utf-8"), request_data.encode("utf-8"), hashlib.sha256
+    # Create HMAC signature; raw request bodies can be passed without decoding
+    if isinstance(request_data, str):
+        request_data = request_data.encode("utf-8")
+    hmac_obj = hmac.new(BREVO_WEBHOOK_KEY, request_data, hashlib.sha256)
+    expected_signature = hmac_obj.hexdigest().encode("ascii")
+
+    # Compare signatures as bytes (str comparison rejects non-ASCII input)
+    return hmac.compare_digest(signature.encode("utf-8"), expected_signature)
+
+
+def job_key(job_id: str) -> str:
+    """Job store key of a job's record"""
+    return f"{job_id}.json"
+
+
+def create_job() -> str:
+    """Register a new queued job"""
+    job_id = uuid.uuid4().hex
+    job_store.set(
+        job_key(job_id), orjson.dumps({"status": "queued", "updated_at": time.time()})
     )
-    expected_signature = hmac_obj.hexdigest()
+    return job_id
+
+
+def update_job(job_id: str, **fields):
+    """Record progress or the outcome of a job"""
+    # Only the thread running a job writes its record, so read-modify-write is
+    # safe; the store replaces the file atomically for concurrent readers
+    record = job_store.get(job_key(job_id), touch=False)
+    job = orjson.loads(record) if record is not None else {}
+    job.update(fields, updated_at=time.time())
+    job_store.set(job_key(job_id), orjson.dumps(job))
+
+
+def run_nda_job(
+    job_id: str, file_content: bytes, analysis_result: dict = None, document=None
+):
+    """Process an NDA in the background and store the outcome on its job"""
+    update_job(job_id, status="running")
+    try:
+        result = process_nda(file_content, analysis_result, document)
+
+        if "error" in result:
+            logger.error(f"Error processing NDA: {result['error']}")
+            update_job(job_id, status="error", error=result["error"])
+            return
+
+        # Store the document for download
+        filename = result["filename"]
+        doc_store.set(filename, result["document"])
+        logger.info(
+            f"Stored document {filename}, size: {len(result['document'])} bytes"
+        )
+
+        outcome = {"changes": result["changes"], "filename": filename}
+        if "warning" in result:
+            outcome["warning"] = result["warning"]
+        update_job(job_id, status="done", **outcome)
+
+    except NDAProcessingError as e:
+        logger.error(f"NDA processing error: {str(e)}")
+        update_job(job_id, status="error", error=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error in NDA job {job_id}: {str(e)}", exc_info=True)
+        update_job(
+            job_id, status="error", error=f"An unexpected error occurred: {str(e)}"
+        )
 
-    # Compare signatures
-    return hmac.compare_digest(signature, expected_signature)
+
+def run_nda_batch_job(job_ids: list, file_contents: list):
+    """Analyze several NDAs in one batched OpenAI round, then redline each"""
+    pending = {}
+    for job_id, file_content in zip(job_ids, file_contents):
+        update_job(job_id, status="running")
+        try:
+            document = AdvancedDocumentProcessor.parse_document(file_content)
+            pending[job_id] = (
+                file_content,
+                document,
+                AdvancedDocumentProcessor.extract_text(document),
+            )
+        except Exception as e:
+            logger.error(f"Error reading NDA for job {job_id}: {str(e)}")
+            update_job(job_id, status="error", error=f"Failed to process NDA: {str(e)}")
+
+    if not pending:
+        return
+
+    try:
+        analyses = analyze_ndas_with_openai([text for _, _, text in pending.values()])
+    except Exception as e:
+        # Nothing else would report these jobs, leaving them "running" forever
+        logger.error(f"Unexpected error in NDA batch: {str(e)}", exc_info=True)
+        for job_id in pending:
+            update_job(
+                job_id, status="error", error=f"An unexpected error occurred: {str(e)}"
+            )
+        return
+
+    # Redlining spends its time waiting on the binary, so the documents are
+    # redlined side by side, each by its own process. Each job records its own
+    # outcome once submitted, so this thread doesn't wait for them.
+    submitted = set()
+    try:
+        for (job_id, (file_content, document, _)), analysis_result in zip(
+            pending.items(), analyses
+        ):
+            redline_executor.submit(
+                run_nda_job, job_id, file_content, analysis_result, document
+            )
+            submitted.add(job_id)
+    except Exception as e:
+        # Such as the executor refusing work during shutdown
+        logger.error(f"Unexpected error in NDA batch: {str(e)}", exc_info=True)
+        for job_id in pending:
+            if job_id not in submitted:
+                update_job(
+                    job_id,
+                    status="error",
+                    error=f"An unexpected error occurred: {str(e)}",
+                )
 
 
 @application.route("/")
@@ -317,45 +679,70 @@ def process_nda_route():
             logger.error("No file provided in request")
             return jsonify({"error": "No file provided"}), 400
 
-        file = request.files["file"]
-        if not file.filename.endswith(".docx"):
-            logger.error(f"Invalid file type: {file.filename}")
-            return jsonify({"error": "Please upload a .docx file"}), 400
-
-        # Read the file content
-        file_content = file.read()
-        logger.info(f"Read file content, size: {len(file_content)} bytes")
-
-        # Process the NDA
-        result = process_nda(file_content)
-
-        if "error" in result:
-            logger.error(f"Error processing NDA: {result['error']}")
-            return jsonify({"error": result["error"]}), 400
-
-        # Initialize processed_docs if it doesn't exist
-        if "processed_docs" not in application.config:
-            application.config["processed_docs"] = {}
-            logger.info("Initialized processed_docs in application config")
-
-        # Store the document in memory
-        filename = result["filename"]
-        application.config["processed_docs"][filename] = result["document"].getvalue()
-        logger.info(
-            f"Stored document {filename} in memory, size: {len(application.config['processed_docs'][filename])} bytes"
+        files = request.files.getlist("file")
+        for file in files:
+            if not file.filename.endswith(".docx"):
+                logger.error(f"Invalid file type: {file.filename}")
+                return jsonify({"error": "Please upload a .docx file"}), 400
+
+        # Read the file contents
+        file_contents = [file.read() for file in files]
+        for file, file_content in zip(files, file_contents):
+            logger.info(
+                f"Read file content for {file.filename}, size: {len(file_content)} bytes"
+            )
+
+        if len(files) == 1:
+            # Queue the NDA for background processing
+            job_id = create_job()
+            job_executor.submit(run_nda_job, job_id, file_contents[0])
+            logger.info(f"Queued NDA job {job_id}")
+
+            return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+        # Several NDAs share one batched analysis but keep a job each
+        job_ids = [create_job() for _ in files]
+        job_executor.submit(run_nda_batch_job, job_ids, file_contents)
+        logger.info(f"Queued batch of {len(job_ids)} NDA jobs")
+
+        return (
+            jsonify(
+                {
+                    "jobs": [
+                        {"job_id": job_id, "file": file.filename, "status": "queued"}
+                        for job_id, file in zip(job_ids, files)
+                    ]
+                }
+            ),
+            202,
         )
 
-        # Return the changes and filename
-        return jsonify({"changes": result["changes"], "filename": filename})
-
-    except NDAProcessingError as e:
-        logger.error(f"NDA processing error: {str(e)}")
-        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Unexpected error in process_nda_route: {str(e)}", exc_info=True)
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 
+@application.route("/status/<job_id>")
+def job_status(job_id):
+    """Report the state of an NDA processing job"""
+    # Polling must not keep the record alive, or a job orphaned by a dead
+    # worker would never expire
+    record = job_store.get(job_key(job_id), touch=False)
+    if record is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    job = orjson.loads(record)
+    updated_at = job.pop("updated_at", 0)
+    if (
+        job["status"] in ("queued", "running")
+        and time.time() - updated_at > JOB_STALE_SECONDS
+    ):
+        logger.error(f"NDA job {job_id} stalled in status {job['status']}")
+        job = {"status": "error", "error": "Processing stalled, please try again"}
+
+    return jsonify({"job_id": job_id, **job})
+
+
 @application.route("/download/<filename>")
 def download_file(filename):
     """Download the processed document"""
@@ -363,33 +750,32 @@ def download_file(filename):
         # Log the requested filename
         logger.info(f"Attempting to download file: {filename}")
 
-        # Check if we have any processed documents
-        processed_docs = application.config.get("processed_docs", {})
-        logger.info(f"Available processed documents: {list(processed_docs.keys())}")
-
-        if filename not in processed_docs:
+        # Serve the stored file by path so the server can use sendfile() and
+        # answer conditional/range requests without reading it into memory
+        doc_path = doc_store.path(filename)
+        if doc_path is None:
             logger.error(f"File not found in processed documents: {filename}")
             return jsonify({"error": "File not found"}), 404
 
-        # Get the document bytes
-        doc_bytes = processed_docs[filename]
-        logger.info(f"Retrieved document bytes, size: {len(doc_bytes)}")
+        doc_size = os.path.getsize(doc_path)
+        logger.info(f"Found stored document, size: {doc_size}")
 
-        if not doc_bytes:
+        if not doc_size:
             logger.error("Document bytes are empty")
             return jsonify({"error": "Document is empty"}), 500
 
-        # Create a new BytesIO object
-        doc_io = BytesIO(doc_bytes)
-        doc_io.seek(0)  # Ensure we're at the start of the file
-
         logger.info("Sending file for download")
         return send_file(
-            doc_io,
+            doc_path,
             mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             as_attachment=True,
             download_name=filename,
+            conditional=True,
         )
+    except FileNotFoundError:
+        # Evicted between the lookup and opening it
+        logger.error(f"File not found in processed documents: {filename}")
+        return jsonify({"error": "File not found"}), 404
     except Exception as e:
         logger.error(f"Error downloading file: {str(e)}", exc_info=True)
         return jsonify({"error": f"Failed to download file: {str(e)}"}), 500
@@ -0,0 +1,120 @@
+import contextlib
+import os
+import logging
+import tempfile
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DocStore:
+    """
+    Size-bounded store for processed documents, kept as files on local disk.
+    Entries expire after a TTL and the least recently used ones are evicted
+    once the store grows past its size limit. Because it lives on disk, every
+    gunicorn worker on the host sees the same documents.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        size_limit: int = 1024 * 1024 * 1024,
+        ttl: int = 3600,
+    ):
+        self.directory = directory
+        self.size_limit = size_limit
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> Optional[str]:
+        # Keys arrive from URLs, so never let them point outside the store
+        if not key or os.path.basename(key) != key or key.startswith("."):
+            return None
+        return os.path.join(self.directory, key)
+
+    def set(self, key: str, data: bytes):
+        path = self._path(key)
+        if path is None:
+            raise ValueError(f"Invalid document key: {key}")
+
+        # Write to a temp file and rename so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get(self, key: str, touch: bool = True) -> Optional[bytes]:
+        path = self.path(key, touch)
+        if path is None:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def path(self, key: str, touch: bool = True) -> Optional[str]:
+        """
+        Return the file holding a live entry, or None. Unless touch is False,
+        this counts as a use, which resets the entry's TTL.
+        """
+        path = self._path(key)
+        if path is None:
+            return None
+
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            if touch:
+                # Access counts as a use for LRU eviction
+                os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+
+    def expire(self):
+        """Drop expired entries, then evict LRU entries over the size limit"""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            # Leftover temp files from interrupted writes expire the same way
+            if now - stat.st_mtime > self.ttl:
+                self._remove(entry.path)
+            elif not entry.name.startswith("."):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.size_limit:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def start_cleanup(self, interval: int = 60):
+        """Run expire() every `interval` seconds on a daemon timer thread"""
+
+        def run():
+            try:
+                self.expire()
+            except Exception as e:
+                logger.error(f"Error cleaning up document store: {str(e)}")
+            self.start_cleanup(interval)
+
+        timer = threading.Timer(interval, run)
+        timer.daemon = True
+        timer.start()
+
+    def _remove(self, path: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
@@ -54,18 +54,45 @@ document.addEventListener('DOMContentLoaded', function() {
         })
         .then(response => response.json())
         .then(data => {
-            uploadStatus.classList.add('hidden');
             if (data.error) {
+                uploadStatus.classList.add('hidden');
                 showError(data.error);
             } else {
+                pollJob(data.job_id);
+            }
+        })
+        .catch(handleRequestError);
+    }
+
+    // Processing runs in the background; poll until the job finishes, giving
+    // up after MAX_POLLS attempts (about 20 minutes)
+    const POLL_INTERVAL_MS = 2000;
+    const MAX_POLLS = 600;
+
+    function pollJob(jobId, attempt = 1) {
+        fetch(`/status/${jobId}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'done') {
+                uploadStatus.classList.add('hidden');
                 displayResults(data);
+            } else if (data.error) {
+                uploadStatus.classList.add('hidden');
+                showError(data.error);
+            } else if (attempt >= MAX_POLLS) {
+                uploadStatus.classList.add('hidden');
+                showError('Processing is taking too long, please try again');
+            } else {
+                setTimeout(() => pollJob(jobId, attempt + 1), POLL_INTERVAL_MS);
             }
         })
-        .catch(error => {
-            uploadStatus.classList.add('hidden');
-            showError('An error occurred while processing your document');
-            console.error('Error:', error);
-        });
+        .catch(handleRequestError);
+    }
+
+    function handleRequestError(error) {
+        uploadStatus.classList.add('hidden');
+        showError('An error occurred while processing your document');
+        console.error('Error:', error);
     }
 
     function showError(message) {
@@ -92,8 +119,14 @@ document.addEventListener('DOMContentLoaded', function() {
             </div>
         `).join('');
 
+        // Part of the NDA could not be analyzed
+        const warningHtml = data.warning ? `
+            <div class="mb-4 p-4 border-l-4 border-yellow-500 bg-yellow-50 text-yellow-800">${data.warning}</div>
+        ` : '';
+
         resultsContainer.innerHTML = `
             <h2 class="text-2xl font-bold text-gray-800 mb-4">Suggested Changes</h2>
+            ${warningHtml}
             <div class="space-y-4">
                 ${changesHtml}
             </div>